@@ -2,27 +2,38 @@
 import streamlit as st
 import pandas as pd
 from model import KeywordMatcher, parse_keywords_field
-import platform
-from PIL import Image
-import pytesseract
+import datetime
+import importlib.util
+import io
 import os
-
-# Tesseract executable path
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-
-# TESSDATA_PREFIX should point to the tessdata folder
-os.environ["TESSDATA_PREFIX"] = r"C:\Program Files\Tesseract-OCR\tessdata"
-
-# Try importing OCR
-try:
+import threading
+
+# OCR libraries are imported lazily, only once an image is uploaded, so the
+# typing-only path doesn't pay their import cost on startup
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+# Prefer tesserocr when installed: it keeps one Tesseract engine loaded
+# instead of spawning a tesseract process (and reloading the model) per image
+TESSEROCR_AVAILABLE = _has_module("tesserocr")
+PYTESSERACT_AVAILABLE = _has_module("pytesseract")
+OCR_AVAILABLE = _has_module("PIL") and (TESSEROCR_AVAILABLE or PYTESSERACT_AVAILABLE)
+
+@st.cache_resource
+def _configure_tesseract():
+    # TESSDATA_PREFIX should point to the tessdata folder. Keep one that's
+    # already set; off Windows, Tesseract locates its own tessdata.
+    if os.name == "nt":
+        os.environ.setdefault("TESSDATA_PREFIX", r"C:\Program Files\Tesseract-OCR\tessdata")
+
+@st.cache_resource
+def _get_pytesseract():
     import pytesseract
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
 
-# Configure Tesseract path on Windows
-if platform.system() == "Windows" and OCR_AVAILABLE:
-    pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"  # adjust if needed
+    # Tesseract executable path (on macOS/Linux it's found on PATH)
+    if os.name == "nt":
+        pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"  # adjust if needed
+    return pytesseract
 
 st.set_page_config(page_title="Keyword-Based Quiz (ML-style)", page_icon="🧠", layout="centered")
 
@@ -37,22 +48,76 @@ def load_questions(path: str) -> pd.DataFrame:
     missing = required - set(df.columns)
     if missing:
         raise ValueError(f"Missing columns in CSV: {missing}")
+    # A blank keywords cell reads as NaN; treat it as "no keywords"
+    df["keywords"] = df["keywords"].fillna("").astype(str)
     return df
 
+# Longest image side fed to Tesseract; plenty for handwriting
+OCR_MAX_SIDE = 1800
+
+@st.cache_resource
+def get_tess_api():
+    from tesserocr import PyTessBaseAPI, OEM, PSM
+
+    # One engine per server process; the lock serialises sessions sharing it.
+    # Without TESSDATA_PREFIX, tesserocr uses the tessdata it was built against.
+    kwargs = {"path": os.environ["TESSDATA_PREFIX"]} if "TESSDATA_PREFIX" in os.environ else {}
+    try:
+        api = PyTessBaseAPI(lang="eng", oem=OEM.LSTM_ONLY, psm=PSM.SINGLE_BLOCK, **kwargs)
+    except RuntimeError:
+        # e.g. eng.traineddata not found: fall back to pytesseract if we can
+        if not PYTESSERACT_AVAILABLE:
+            raise
+        return None
+    return api, threading.Lock()
+
+@st.cache_data(show_spinner=False)
+def ocr_extract(img_bytes: bytes) -> str:
+    # Keyed on the uploaded bytes, so reruns with the same image skip OCR
+    from PIL import Image
+
+    _configure_tesseract()
+    img = Image.open(io.BytesIO(img_bytes))
+    # Phone photos are far larger than OCR needs and LSTM cost scales with pixels;
+    # Tesseract works on grayscale anyway, so convert here and skip its copy
+    if max(img.size) > OCR_MAX_SIDE:
+        img.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE), Image.LANCZOS)
+    img = img.convert("L")
+    tess = get_tess_api() if TESSEROCR_AVAILABLE else None
+    if tess is not None:
+        api, lock = tess
+        with lock:
+            api.SetImage(img)
+            return api.GetUTF8Text()
+    # --psm 6: treat the answer as one text block, skipping page layout analysis
+    return _get_pytesseract().image_to_string(img, config="--psm 6")
+
+@st.cache_data(show_spinner=False)
+def build_csv(answers: list) -> bytes:
+    return pd.DataFrame(answers).to_csv(index=False).encode()
+
+@st.cache_resource
+def get_matcher(marks: int) -> KeywordMatcher:
+    # Shared across reruns, so the matcher isn't rebuilt on every keystroke
+    return KeywordMatcher(marks_per_question=marks)
+
 df = load_questions("data/questions.csv")
 marks_per_question = st.sidebar.number_input("Marks per question", min_value=1, max_value=20, value=10)
-matcher = KeywordMatcher(marks_per_question=marks_per_question)
+matcher = get_matcher(marks_per_question)
 
 if 'current' not in st.session_state:
     st.session_state.current = 0
 if 'answers' not in st.session_state:
     st.session_state.answers = []
+if 'total_score' not in st.session_state:
+    st.session_state.total_score = 0.0
 
 total_questions = len(df)
 
 def reset_quiz():
     st.session_state.current = 0
     st.session_state.answers = []
+    st.session_state.total_score = 0.0
 
 st.sidebar.button("🔁 Restart quiz", on_click=reset_quiz)
 
@@ -77,8 +142,7 @@ if st.session_state.current < total_questions:
     if mode == "Upload image (OCR)" and OCR_AVAILABLE:
         uploaded_image = st.file_uploader("Upload your handwritten answer (PNG/JPG)", type=["png", "jpg", "jpeg"])
         if uploaded_image:
-            img = Image.open(uploaded_image).convert("RGB")
-            extracted_text = pytesseract.image_to_string(img)
+            extracted_text = ocr_extract(uploaded_image.getvalue())
             if extracted_text.strip():
                 st.success("OCR text extracted. You can edit it below.")
             else:
@@ -99,7 +163,11 @@ if st.session_state.current < total_questions:
 
     if submitted or skipped:
         final_text = user_ans if submitted else ""
-        result = matcher.score(final_text, row["keywords"]) if submitted else matcher.score("", row["keywords"])
+        # score() reuses specs parsed/compiled once per keyword field (see model._compile_cached)
+        result = matcher.score(final_text, row["keywords"])
+        # The matcher doesn't collect per-spec details (always []), so they
+        # stay out of the results table/CSV
+        result.pop("details")
 
         st.session_state.answers.append({
             "question": row["question"],
@@ -107,14 +175,15 @@ if st.session_state.current < total_questions:
             "your_answer": final_text,
             **result
         })
+        st.session_state.total_score += result["score"]
         st.session_state.current += 1
         st.rerun()
 
 # ----------------- Quiz Results Block -----------------
 else:
     st.success("🎉 Quiz complete! Here's your performance breakdown:")
-    results_df = pd.DataFrame(st.session_state.answers)
-    total_score = results_df["score"].sum()
+    # Running total kept at submit time, so the metrics need no DataFrame
+    total_score = st.session_state.total_score
     max_score = marks_per_question * total_questions
     overall_pct = (total_score / max_score) * 100 if max_score else 0
 
@@ -122,19 +191,22 @@ else:
     st.metric("Overall Percentage", f"{overall_pct:.2f}%")
 
     with st.expander("📋 Detailed per-question results", expanded=True):
+        results_df = pd.DataFrame(st.session_state.answers)
         show_cols = ["question", "your_answer", "score", "percentage_for_question",
                      "matched_unweighted", "total_keywords", "matched_weight", "total_weight", "keywords"]
         st.dataframe(results_df[show_cols], use_container_width=True)
 
-    # Save results
-    import os, datetime
-    os.makedirs("results", exist_ok=True)
+    # Save results: the CSV is built once per set of answers, not on every rerun
+    csv_bytes = build_csv(st.session_state.answers)
     ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_path = f"results/quiz_results_{ts}.csv"
-    results_df.to_csv(out_path, index=False)
-
-    with open(out_path, "rb") as f:
-        st.download_button(label="⬇️ Download results CSV", data=f,
-                           file_name=f"quiz_results_{ts}.csv", mime="text/csv")
+    st.download_button(label="⬇️ Download results CSV", data=csv_bytes,
+                       file_name=f"quiz_results_{ts}.csv", mime="text/csv")
+
+    if st.sidebar.button("💾 Save results to disk"):
+        os.makedirs("results", exist_ok=True)
+        out_path = f"results/quiz_results_{ts}.csv"
+        with open(out_path, "wb") as f:
+            f.write(csv_bytes)
+        st.sidebar.success(f"Saved to {out_path}")
 
     st.info("Tip: You can edit `data/questions.csv` to add or modify questions and keyword specs, then restart the quiz from the sidebar.")
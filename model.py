@@ -6,25 +6,53 @@
 #
 # Matching is word-boundary-aware substring search on normalized text.
 
-from dataclasses import dataclass
-from typing import List, Tuple, Dict, Any
+from dataclasses import dataclass, field as dc_field
+from functools import lru_cache
+from itertools import compress, groupby
+from typing import List, FrozenSet, Iterator, Optional, Sequence, Set, Tuple, Dict, Any
 import re
-import string
 
-_punct_tbl = str.maketrans({p: " " for p in string.punctuation})
+# Optional Aho-Corasick backend; falls back to plain substring checks if missing
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Anything that isn't a letter or digit separates words (what regex \b saw as a
+# boundary), so curly quotes, dashes etc. don't glue words together.
+_non_word_re = re.compile(r"[\W_]+")
+# ASCII fast path: one translate pass folds A-Z to a-z and every other
+# non-alphanumeric character to a space
+_ascii_tbl = str.maketrans({c: (c.lower() if c.isalnum() else " ")
+                            for c in map(chr, range(128))})
 
 def normalize(text: str) -> str:
-    if text is None:
+    if not text:
         return ""
     # lowercase, replace punctuation with spaces, collapse whitespace
-    text = text.lower().translate(_punct_tbl)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    if text.isascii():
+        text = text.translate(_ascii_tbl)
+    else:
+        text = _non_word_re.sub(" ", text.lower())
+    return " ".join(text.split())
 
-@dataclass
+@dataclass(frozen=True)
 class KeywordSpec:
-    alternatives: List[str]   # list of normalized alternatives for this concept
-    weight: float             # importance weight
+    # Frozen: parsed specs are cached and shared across sessions
+    alternatives: Tuple[str, ...]   # normalized alternatives for this concept
+    weight: float                   # importance weight
+    # Derived: single-word alts are checked by set membership against the
+    # answer's tokens; only multi-word alts go through the phrase scanner.
+    single_word: FrozenSet[str] = dc_field(init=False, repr=False)
+    multi_word: Tuple[str, ...] = dc_field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "alternatives", tuple(self.alternatives))
+        object.__setattr__(self, "single_word",
+                           frozenset(a for a in self.alternatives if " " not in a))
+        object.__setattr__(self, "multi_word",
+                           tuple(a for a in self.alternatives if " " in a))
 
 def parse_keywords_field(field: str) -> List[KeywordSpec]:
     """
@@ -36,7 +64,7 @@ def parse_keywords_field(field: str) -> List[KeywordSpec]:
     Returns a list of KeywordSpec objects.
     """
     specs: List[KeywordSpec] = []
-    if not field or not field.strip():
+    if not isinstance(field, str) or not field.strip():
         return specs
     for raw in field.split(";"):
         raw = raw.strip()
@@ -53,23 +81,114 @@ def parse_keywords_field(field: str) -> List[KeywordSpec]:
             phrase_part, weight = raw, 1.0
 
         alts = [normalize(p.strip()) for p in phrase_part.split("|") if p.strip()]
-        alts = [a for a in alts if a]
+        alts = list(dict.fromkeys(a for a in alts if a))   # drop empties and repeats, keep order
         if not alts:
             continue
         specs.append(KeywordSpec(alternatives=alts, weight=weight))
     return specs
 
-def _alt_regex(alt: str) -> re.Pattern:
-    # Build a word-boundary-aware regex for a (possibly multi-word) phrase.
-    # Example: "carbon dioxide" -> r"\bcarbon\s+dioxi de\b" (spaces allowed as single/multiple spaces)
-    # We'll escape special chars and replace spaces with \s+
-    alt_escaped = re.escape(alt)
-    alt_escaped = re.sub(r"\\\s+", r"\\s+", alt_escaped)  # normalize any escaped spaces into \s+
-    alt_escaped = alt_escaped.replace(r"\ ", r"\s+")
-    pattern = rf"\b{alt_escaped}\b"
-    return re.compile(pattern, flags=re.IGNORECASE)
-
-def match_answer(answer_text: str, specs: List[KeywordSpec]) -> Dict[str, Any]:
+@lru_cache(maxsize=None)
+def _parse_cached(field: str) -> Tuple[KeywordSpec, ...]:
+    # A question's keyword field is the same string on every submit/rerun,
+    # so parse it once. Tuples of frozen specs, so callers can't mutate the cache.
+    return tuple(parse_keywords_field(field))
+
+@dataclass
+class CompiledKeywords:
+    # Flattened view of one question's specs, built once by compile_specs().
+    # Matching fills a bool list over specs; weights are summed against it.
+    specs: Tuple[KeywordSpec, ...]
+    weights: Tuple[float, ...]                 # one per spec
+    total_weight: float
+    single_word: Dict[str, Tuple[int, ...]]    # single-word alt -> indices of specs using it
+    alt_spec_idx: List[Tuple[int, ...]]        # phrase index -> indices of specs using that phrase
+    multi_spec_idx: Tuple[int, ...]            # specs with at least one multi-word alt
+    scanner: Any                               # phrase scanner over the distinct multi-word alts, or None
+
+    @property
+    def num_specs(self) -> int:
+        return len(self.specs)
+
+def _alt_owners(specs: Sequence[KeywordSpec], attr: str) -> Dict[str, Tuple[int, ...]]:
+    # Each distinct alternative in spec.<attr> -> indices of the specs using it,
+    # in sorted order so phrases sharing a prefix sit next to each other.
+    # An alt shared by several specs is scanned once and credits all of them.
+    owners: Dict[str, List[int]] = {}
+    for i, spec in enumerate(specs):
+        for alt in getattr(spec, attr):
+            owners.setdefault(alt, []).append(i)
+    return {alt: tuple(owners[alt]) for alt in sorted(owners)}
+
+def _compile_automaton(alts: Sequence[str]) -> "ahocorasick.Automaton":
+    automaton = ahocorasick.Automaton()
+    for j, alt in enumerate(alts):
+        automaton.add_word(alt, (j, len(alt)))
+    automaton.make_automaton()
+    return automaton
+
+def _compile_needles(alts: Sequence[str]) -> Dict[str, Tuple[Tuple[str, ...], Tuple[int, ...]]]:
+    # First word -> (padded needles, phrase indices): the top level of a
+    # word trie. A phrase can only match if its first word is one of the
+    # answer's tokens, so whole groups are skipped with one set lookup.
+    # alts are sorted, so phrases with the same first word are contiguous.
+    groups = {}
+    for word, group in groupby(enumerate(alts), key=lambda ja: ja[1].split(" ", 1)[0]):
+        group = list(group)
+        groups[word] = (tuple(f" {alt} " for _, alt in group), tuple(j for j, _ in group))
+    return groups
+
+def _compile_scanner(alts: Sequence[str]) -> Any:
+    # Aho-Corasick automaton when pyahocorasick is installed, otherwise
+    # space-padded needles grouped by first word for plain substring checks
+    if not alts:
+        return None
+    if AHOCORASICK_AVAILABLE:
+        return _compile_automaton(alts)
+    return _compile_needles(alts)
+
+def compile_specs(specs: Sequence[KeywordSpec]) -> CompiledKeywords:
+    """
+    Flatten a question's specs into a CompiledKeywords (weights,
+    single-word lookup table, and a phrase scanner over the multi-word
+    alternatives). Pass the result to match_answer(); build it once per
+    keyword field.
+    """
+    specs = tuple(specs)
+    weights = tuple(spec.weight for spec in specs)
+    phrases = _alt_owners(specs, "multi_word")
+    return CompiledKeywords(
+        specs=specs,
+        weights=weights,
+        total_weight=sum(weights, 0.0),
+        single_word=_alt_owners(specs, "single_word"),
+        alt_spec_idx=list(phrases.values()),
+        multi_spec_idx=tuple(i for i, spec in enumerate(specs) if spec.multi_word),
+        scanner=_compile_scanner(list(phrases)),
+    )
+
+def _iter_hits(scanner: Any, answer_norm: str, tokens: Set[str]) -> Iterator[int]:
+    # Yield the phrase index (into alt_spec_idx) of every phrase found in the answer.
+    # Normalized text is single-space separated, so a word boundary is just a
+    # space (or the padded string edge) on both sides of the hit.
+    padded = f" {answer_norm} "
+    if isinstance(scanner, dict):
+        for word in tokens.intersection(scanner):
+            needles, idxs = scanner[word]
+            # map/compress keep the per-needle loop in C: one str.__contains__
+            # call per needle and no Python bytecode between them
+            yield from compress(idxs, map(padded.__contains__, needles))
+        return
+    for end, (j, n) in scanner.iter(padded):
+        if padded[end - n] == " " and padded[end + 1] == " ":
+            yield j
+
+@lru_cache(maxsize=None)
+def _compile_cached(field: str) -> CompiledKeywords:
+    return compile_specs(_parse_cached(field))
+
+def match_answer(answer_text: str, specs: Sequence[KeywordSpec],
+                 compiled: Optional[CompiledKeywords] = None,
+                 collect_details: bool = True) -> Dict[str, Any]:
     """
     Return details:
       {
@@ -78,45 +197,77 @@ def match_answer(answer_text: str, specs: List[KeywordSpec]) -> Dict[str, Any]:
         'details': [ {'alts': [...], 'weight': w, 'matched_alt': '...', 'matched': bool }, ... ],
         'matched_weight': float
       }
+    `compiled` comes from compile_specs(specs); built on the fly if omitted.
+    With collect_details=False, 'details' is left empty and only the counts are computed.
     """
+    if compiled is None:
+        compiled = compile_specs(specs)
     answer_norm = normalize(answer_text)
-    details = []
-    matched_weight = 0.0
-    total_weight = 0.0
-
-    for spec in specs:
-        total_weight += spec.weight
-        found = False
-        matched_alt = None
-        for alt in spec.alternatives:
-            # Use regex with word boundaries to avoid partial matches
-            if _alt_regex(alt).search(answer_norm):
-                found = True
-                matched_alt = alt
+    tokens = set(answer_norm.split())
+    matched = [False] * compiled.num_specs
+
+    # Single-word alts: O(1) set lookups, no scanning
+    for tok in tokens.intersection(compiled.single_word):
+        for i in compiled.single_word[tok]:
+            matched[i] = True
+
+    # Multi-word alts: one pass of the phrase scanner.
+    # Stop as soon as every spec that could still match has matched.
+    pending = sum(1 for i in compiled.multi_spec_idx if not matched[i])
+    if pending:
+        for j in _iter_hits(compiled.scanner, answer_norm, tokens):
+            for i in compiled.alt_spec_idx[j]:
+                if not matched[i]:
+                    matched[i] = True
+                    pending -= 1
+            if not pending:
                 break
-        details.append({
-            "alts": spec.alternatives,
-            "weight": spec.weight,
-            "matched_alt": matched_alt,
-            "matched": found
-        })
-        if found:
-            matched_weight += spec.weight
+
+    details = []
+    if collect_details:
+        padded = f" {answer_norm} "
+        for spec, found in zip(compiled.specs, matched):
+            matched_alt = None
+            if found:
+                matched_alt = next(a for a in spec.alternatives
+                                   if (f" {a} " in padded if " " in a else a in tokens))
+            details.append({
+                "alts": list(spec.alternatives),
+                "weight": spec.weight,
+                "matched_alt": matched_alt,
+                "matched": found
+            })
 
     return {
-        "matched_count": sum(1 for d in details if d["matched"]),  # unweighted count for info
-        "total_weight": total_weight,
-        "matched_weight": matched_weight,
+        "matched_count": sum(matched),  # unweighted count for info
+        "total_weight": compiled.total_weight,
+        "matched_weight": sum((w for w, m in zip(compiled.weights, matched) if m), 0.0),
         "details": details
     }
 
 class KeywordMatcher:
-    def __init__(self, marks_per_question: float = 10.0):
+    def __init__(self, marks_per_question: float = 10.0, collect_details: bool = False):
         self.marks_per_question = marks_per_question
+        # Per-spec match details aren't shown in the UI, so they're opt-in
+        self.collect_details = collect_details
 
     def score(self, user_answer: str, keyword_field: str) -> Dict[str, Any]:
-        specs = parse_keywords_field(keyword_field)
-        res = match_answer(user_answer, specs)
+        return self.score_precompiled(user_answer, _compile_cached(keyword_field))
+
+    def score_precompiled(self, user_answer: str, compiled: CompiledKeywords) -> Dict[str, Any]:
+        # Same as score(), for callers holding a compile_specs() result
+        if not self.collect_details and (not user_answer or not user_answer.strip()):
+            # Skipped/blank answer: nothing can match, so skip the matching work
+            return {
+                "score": 0.0,
+                "percentage_for_question": 0.0,
+                "matched_unweighted": 0,
+                "total_keywords": compiled.num_specs,
+                "matched_weight": 0.0,
+                "total_weight": round(compiled.total_weight, 2),
+                "details": []
+            }
+        res = match_answer(user_answer, compiled.specs, compiled, self.collect_details)
         if res["total_weight"] == 0:
             score = 0.0
             pct = 0.0
@@ -128,7 +279,7 @@ class KeywordMatcher:
             "score": round(score, 2),
             "percentage_for_question": round(pct, 2),
             "matched_unweighted": res["matched_count"],
-            "total_keywords": len(res["details"]),
+            "total_keywords": compiled.num_specs,
             "matched_weight": round(res["matched_weight"], 2),
             "total_weight": round(res["total_weight"], 2),
             "details": res["details"]
@@ -0,0 +1,103 @@
+import pytest
+
+import model
+from model import KeywordMatcher, normalize
+
+
+@pytest.fixture(params=["ahocorasick", "substring"])
+def backend(request, monkeypatch):
+    # Run a test against both phrase scanners; compiled specs are cached
+    # per keyword field, so drop them when switching
+    if request.param == "ahocorasick":
+        pytest.importorskip("ahocorasick")
+    monkeypatch.setattr(model, "AHOCORASICK_AVAILABLE", request.param == "ahocorasick")
+    model._compile_cached.cache_clear()
+    yield request.param
+    model._compile_cached.cache_clear()
+
+
+@pytest.mark.parametrize("answer, keywords, matched", [
+    # Non-ASCII punctuation is a word boundary, same as ASCII punctuation
+    ("Plants need water’s energy", "water", 1),
+    ("The plants—water", "plants; water", 2),
+    ("carbon dioxide’s role", "carbon dioxide", 1),
+    ("“Paris”…", "paris:2", 1),
+    # Specs whose phrases start on the same word are all found
+    ("carbon dioxide gas", "carbon:1; carbon dioxide:2", 2),
+    ("green plants need green light", "green plants; green light; plants need", 3),
+    # Still no partial-word matches
+    ("watery plantsx", "water; plants", 0),
+    ("carbon dioxides", "carbon dioxide", 0),
+])
+def test_word_boundaries(backend, answer, keywords, matched):
+    assert KeywordMatcher().score(answer, keywords)["matched_unweighted"] == matched
+
+
+def test_scanner_backend(backend):
+    compiled = model.compile_specs(model.parse_keywords_field("carbon dioxide; water"))
+    if backend == "substring":
+        # First word -> (padded needles, phrase indices)
+        assert compiled.scanner == {"carbon": ((" carbon dioxide ",), (0,))}
+    else:
+        assert not isinstance(compiled.scanner, dict)
+
+
+def test_weighted_score(backend):
+    res = KeywordMatcher(marks_per_question=10).score(
+        "Plants use sunlight and water", "plants:2; sunlight|solar energy; carbon dioxide:2; water")
+    assert res["matched_unweighted"] == 3
+    assert res["matched_weight"] == 4.0
+    assert res["total_weight"] == 6.0
+    assert res["score"] == 6.67
+
+
+def test_details_opt_in(backend):
+    keywords = "sunlight|solar energy:1.5; water"
+    assert KeywordMatcher().score("solar energy", keywords)["details"] == []
+    details = KeywordMatcher(collect_details=True).score("solar energy", keywords)["details"]
+    assert details == [
+        {"alts": ["sunlight", "solar energy"], "weight": 1.5, "matched_alt": "solar energy", "matched": True},
+        {"alts": ["water"], "weight": 1.0, "matched_alt": None, "matched": False},
+    ]
+
+
+@pytest.mark.parametrize("answer", ["", "   \n"])
+def test_blank_answer_skips_matching(backend, monkeypatch, answer):
+    def fail(*args, **kwargs):
+        raise AssertionError("blank answer went through match_answer")
+    monkeypatch.setattr(model, "match_answer", fail)
+    assert KeywordMatcher().score(answer, "plants:2; carbon dioxide") == {
+        "score": 0.0,
+        "percentage_for_question": 0.0,
+        "matched_unweighted": 0,
+        "total_keywords": 2,
+        "matched_weight": 0.0,
+        "total_weight": 3.0,
+        "details": [],
+    }
+
+
+def test_stops_scanning_once_every_spec_matched(backend, monkeypatch):
+    consumed = []
+    iter_hits = model._iter_hits
+
+    def counting(*args):
+        for j in iter_hits(*args):
+            consumed.append(j)
+            yield j
+    monkeypatch.setattr(model, "_iter_hits", counting)
+
+    # One spec, two phrase alts: the first hit settles it
+    res = KeywordMatcher().score("carbon dioxide and green plants", "carbon dioxide|green plants")
+    assert res["matched_unweighted"] == 1
+    assert len(consumed) == 1
+
+    # Matched by a single-word alt: the phrase scanner never runs
+    consumed.clear()
+    res = KeywordMatcher().score("water and green plants", "water|green plants")
+    assert res["matched_unweighted"] == 1
+    assert consumed == []
+
+
+def test_normalize_splits_on_any_non_alphanumeric():
+    assert normalize("Water’s—Café_x y") == "water s café x y"